@@ -1,8 +1,8 @@
-from flask import Flask, request, jsonify, Response, stream_with_context, send_from_directory
+from flask import Flask, abort, g, has_request_context, request, Response, stream_with_context, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
+from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt, get_jwt_identity
 from flask_migrate import Migrate
-from flask_bcrypt import Bcrypt
 import os
 from dotenv import load_dotenv
 import random
@@ -11,35 +11,197 @@ from datetime import datetime, timedelta
 import time
 import threading
 import queue
-import uuid
+import secrets
+import hashlib
+import orjson
+import redis
 from decimal import Decimal
 from flask_sqlalchemy import SQLAlchemy
-from extensions import db
+from sqlalchemy import bindparam, cast, event, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import joinedload, load_only, raiseload
+from extensions import db, bcrypt
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Read configuration once at import; DATABASE_URI overrides the individual DB_* settings
+DATABASE_URI = os.getenv('DATABASE_URI') or f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-secret-key').encode('utf-8')  # Change in production
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# Development aid: warn when a request runs more SQL statements than this (0 disables counting)
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', '0'))
+
+
+class ORJSONProvider(JSONProvider):
+    # Decimals are stringified by the routes already; default=str covers any stragglers
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=str).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+# INSERT supporting ON CONFLICT for the bound dialect (Postgres in production, SQLite locally)
+def upsert_insert(model):
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def ojsonify(payload, status=200):
+    return Response(orjson.dumps(payload, default=str), status=status, mimetype='application/json')
+
+
+# Serve a serialized public payload with an ETag, answering If-None-Match with 304
+def cacheable_response(body):
+    response = Response(body, mimetype='application/json')
+    response.set_etag(hashlib.blake2b(body, digest_size=16).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response.make_conditional(request)
+
 
 def create_app():
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
+
+    # Room in the compiled statement cache for every route's queries plus the lambda statements
+    engine_options = {'query_cache_size': 1200}
+    # Pool and psycopg2 tuning only applies to Postgres; SQLite (local runs, tests) keeps the driver defaults
+    if make_url(DATABASE_URI).get_backend_name() == 'postgresql':
+        engine_options.update({
+            # Size the pool for concurrent workers (Postgres max_connections must cover workers x 50);
+            # statement_timeout stops runaway queries holding a connection
+            'pool_size': 25,
+            'max_overflow': 25,
+            'pool_pre_ping': True,
+            # Recycle before the hosted pooler drops idle connections; LIFO lets surplus ones go idle
+            'pool_recycle': 300,
+            'pool_use_lifo': True,
+            'connect_args': {'options': '-c statement_timeout=5000'},
+            # psycopg2: page INSERT executemany into multi-row VALUES and batch the stock UPDATEs
+            'executemany_mode': 'values_plus_batch'
+        })
 
     # PostgreSQL configuration
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')  # Change in production
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=DATABASE_URI,
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SQLALCHEMY_ENGINE_OPTIONS=engine_options,
+        JWT_SECRET_KEY=JWT_SECRET_KEY,
+        JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=1)
+    )
    
     # Initialize extensions with app
     db.init_app(app)
-    from models import User, Product, Category, Order, OrderItem, Review, CartItem, Address, ProductImage
+    from models import User, Product, Category, Order, OrderItem, Review, CartItem, Address, ProductImage, refresh_product_rating, cents_to_decimal, MAX_PRICE_CENTS
 
     
     migrate=Migrate(app, db)
-    bcrypt=Bcrypt(app)
+    bcrypt.init_app(app)
     jwt=JWTManager(app)
     CORS(app,resources={r"/*": {"origins": "*", "allow_headers": "*", "expose_headers": "*"}},supports_credentials=True)
+
+    # Count statements per request so N+1 regressions show up in development logs and headers
+    if QUERY_BUDGET:
+        with app.app_context():
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def count_query(conn, cursor, statement, parameters, context, executemany):
+                if has_request_context():
+                    g.query_count = g.get('query_count', 0) + 1
+
+        @app.after_request
+        def report_query_count(response):
+            query_count = g.get('query_count', 0)
+            response.headers['X-Query-Count'] = str(query_count)
+            if query_count > QUERY_BUDGET:
+                app.logger.warning('%s %s ran %d queries (budget %d)', request.method, request.path, query_count, QUERY_BUDGET)
+            return response
+
+    # Redis response cache; it is best-effort, so requests fall back to the database if it is down
+    cache = redis.Redis.from_url(REDIS_URL, socket_timeout=1)
+
+    def cache_get(key):
+        try:
+            return cache.get(key)
+        except redis.RedisError:
+            return None
+
+    def cache_set(key, value, ttl):
+        try:
+            cache.setex(key, ttl, value)
+        except redis.RedisError:
+            pass
+
+    def cache_delete(*keys):
+        try:
+            cache.delete(*keys)
+        except redis.RedisError:
+            pass
+
+    def cache_incr(key, ttl):
+        try:
+            if cache.incr(key) == 1:
+                cache.expire(key, ttl)
+        except redis.RedisError:
+            pass
+
+    # Admin status travels in the JWT; tokens issued before the claim existed fall back to the database
+    def current_user_is_admin():
+        claims = get_jwt()
+        if 'is_admin' in claims:
+            return claims['is_admin']
+        return User.query.get_or_404(int(get_jwt_identity())).is_admin
+
+    # Prices arrive as decimal strings or numbers; None means the value is not a usable price:
+    # booleans, sub-cent amounts and amounts too large for the price_cents column are refused
+    def parse_price(value):
+        if isinstance(value, bool):
+            return None
+        try:
+            # Floats go through their shortest repr so 9.99 stays 9.99 rather than its binary expansion
+            price = Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+        except (TypeError, ValueError, ArithmeticError):
+            return None
+        if not price.is_finite() or price < 0 or price > cents_to_decimal(MAX_PRICE_CENTS):
+            return None
+        if price != price.quantize(Decimal('0.01')):
+            return None
+        return price
+
+    # Checked against the category snapshot so product writes don't fail on the foreign key
+    def category_exists(category_id):
+        try:
+            return Category.get_cached(int(category_id)) is not None
+        except (TypeError, ValueError):
+            return False
+
+    # The version names the shape of the cached login dict (v2 added is_admin and password_hash);
+    # bump it with any field change so entries left by older code are never read back
+    def login_cache_key(email):
+        return f'user:v2:email:{email}'
+
+    # Columns needed to authenticate a user, cached by email for the login path
+    def load_login_user(email):
+        cache_key = login_cache_key(email)
+        cached = cache_get(cache_key)
+        if cached is not None:
+            return orjson.loads(cached)
+
+        row = User.login_row(email)
+        if not row:
+            return None
+
+        user = row._asdict()
+        # The hash is ASCII bytes; keep it as text so the entry can be cached as JSON
+        user['password_hash'] = bytes(user['password_hash']).decode('ascii')
+        cache_set(cache_key, orjson.dumps(user), 300)
+        return user
+
     # Favicon route to handle the browser request
     @app.route('/favicon.ico')
     def favicon():
@@ -54,7 +216,7 @@ def create_app():
     # Root route to check if API is running
     @app.route('/', methods=['GET'])
     def home():
-        return jsonify({"message": "API is running"}), 200
+        return ojsonify({"message": "API is running"})
         
     # Authentication routes
     @app.route('/register', methods=['POST'])
@@ -63,30 +225,32 @@ def create_app():
 
         required_fields = ['username', 'email', 'password']
         if not all(field in data for field in required_fields):
-            return jsonify({'error': 'Missing required fields'}), 400
-
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({'error': 'Username already exists'}), 400
+            return ojsonify({'error': 'Missing required fields'}, 400)
 
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({'error': 'Email already exists'}), 400
-
-        hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+        # Check username and email uniqueness in one query (at most two rows can match)
+        existing = db.session.query(User.username, User.email).filter(
+            or_(User.username == data['username'], User.email == data['email'])
+        ).all()
+        if any(row.username == data['username'] for row in existing):
+            return ojsonify({'error': 'Username already exists'}, 400)
+        if existing:
+            return ojsonify({'error': 'Email already exists'}, 400)
 
         new_user = User(
             username=data['username'],
             email=data['email'],
-            password=hashed_password,
             first_name=data.get('first_name', ''),
             last_name=data.get('last_name', '')
         )
+        new_user.set_password(data['password'])
 
         db.session.add(new_user)
         db.session.commit()
+        cache_delete(login_cache_key(new_user.email))
 
-        access_token = create_access_token(identity=new_user.id)
+        access_token = create_access_token(identity=str(new_user.id), additional_claims={'is_admin': bool(new_user.is_admin)})
 
-        return jsonify({
+        return ojsonify({
             'message': 'User registered successfully',
             'access_token': access_token,
             'user': {
@@ -96,31 +260,42 @@ def create_app():
                 'first_name': new_user.first_name,
                 'last_name': new_user.last_name
             }
-        }), 201
+        }, 201)
 
     @app.route('/login', methods=['POST'])
     def login():
         data = request.get_json()
 
         if not data or not data.get('email') or not data.get('password'):
-            return jsonify({'error': 'Missing email or password'}), 400
+            return ojsonify({'error': 'Missing email or password'}, 400)
+
+        # Refuse early after repeated failures so credential stuffing never reaches the KDF
+        failures_key = f"login_failures:{data['email']}:{request.remote_addr}"
+        failures = cache_get(failures_key)
+        if failures is not None and int(failures) >= 5:
+            return ojsonify({'error': 'Too many failed login attempts, try again later'}, 429)
 
-        user = User.query.filter_by(email=data['email']).first()
+        user = load_login_user(data['email'])
 
-        if not user or not bcrypt.check_password_hash(user.password, data['password']):
-            return jsonify({'error': 'Invalid email or password'}), 401
+        if not user or not bcrypt.check_password_hash(user['password_hash'], data['password']):
+            cache_incr(failures_key, 60)
+            return ojsonify({'error': 'Invalid email or password'}, 401)
 
-        access_token = create_access_token(identity=user.id)
+        # Only consecutive failures count towards the limit
+        if failures is not None:
+            cache_delete(failures_key)
 
-        return jsonify({
+        access_token = create_access_token(identity=str(user['id']), additional_claims={'is_admin': bool(user['is_admin'])})
+
+        return ojsonify({
             'message': 'Login successful',
             'access_token': access_token,
             'user': {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name
+                'id': user['id'],
+                'username': user['username'],
+                'email': user['email'],
+                'first_name': user['first_name'],
+                'last_name': user['last_name']
             }
         })
 
@@ -129,10 +304,10 @@ def create_app():
     @app.route('/users/me', methods=['GET'])
     @jwt_required()
     def get_user_profile():
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         user = User.query.get_or_404(current_user_id)
 
-        return jsonify({
+        return ojsonify({
             'id': user.id,
             'username': user.username,
             'email': user.email,
@@ -145,9 +320,10 @@ def create_app():
     @app.route('/users/me', methods=['PUT'])
     @jwt_required()
     def update_user_profile():
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         user = User.query.get_or_404(current_user_id)
         data = request.get_json()
+        previous_email = user.email
 
         # Update user fields
         if 'first_name' in data:
@@ -156,15 +332,16 @@ def create_app():
             user.last_name = data['last_name']
         if 'email' in data:
             # Check if email already exists
-            if data['email'] != user.email and User.query.filter_by(email=data['email']).first():
-                return jsonify({'error': 'Email already exists'}), 400
+            if data['email'] != user.email and User.by_email(data['email']):
+                return ojsonify({'error': 'Email already exists'}, 400)
             user.email = data['email']
         if 'password' in data:
             user.set_password(data['password'])
 
         db.session.commit()
+        cache_delete(login_cache_key(previous_email))
 
-        return jsonify({
+        return ojsonify({
             'message': 'Profile updated successfully',
             'user': {
                 'id': user.id,
@@ -181,50 +358,91 @@ def create_app():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         category_id = request.args.get('category_id', type=int)
+        after_id = request.args.get('after_id', type=int)
+        include_total = request.args.get('include_total', 0, type=int)
+
+        if page < 1 or per_page < 1:
+            abort(404)
 
-        query = Product.query.filter_by(is_active=True)
+        query = Product.query.options(
+            load_only(*Product.list_columns()),
+            raiseload('*')
+        ).filter_by(is_active=True)
 
         # Filter by category if provided
         if category_id:
             query = query.filter_by(category_id=category_id)
 
-        # Apply pagination
-        pagination = query.paginate(page=page, per_page=per_page)
-        products = pagination.items
+        # Keyset pagination: seek past the cursor on the (is_active, [category_id,] id) index
+        page_query = query.order_by(Product.id)
+        if after_id is not None:
+            page_query = page_query.filter(Product.id > after_id)
+        elif page > 1:
+            # OFFSET paging is kept for existing clients; deep pages should use after_id
+            page_query = page_query.offset((page - 1) * per_page)
+
+        # Fetch one extra row to know whether another page exists
+        products = page_query.limit(per_page + 1).all()
+        has_more = len(products) > per_page
+        products = products[:per_page]
 
         # Format response
         result = []
         for product in products:
-            # Get primary image
-            primary_image = ProductImage.query.filter_by(product_id=product.id, is_primary=True).first()
-            image_url = primary_image.image_url if primary_image else None
-
             result.append({
                 'id': product.id,
                 'name': product.name,
                 'description': product.description,
-                'price': str(product.price),
+                'price': str(cents_to_decimal(product.price_cents)),
                 'stock': product.stock,
                 'sku': product.sku,
                 'category_id': product.category_id,
-                'image_url': image_url,
+                'image_url': product.primary_image_url,
+                'avg_rating': product.avg_rating,
+                'review_count': product.review_count,
                 'created_at': product.created_at.isoformat()
             })
 
-        return jsonify({
+        response = {
             'products': result,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
-        })
+            'has_more': has_more,
+            'next_cursor': products[-1].id if has_more else None
+        }
+        if after_id is None:
+            response['current_page'] = page
+
+        # The COUNT(*) scans every matching row, so it is only run on request
+        if include_total:
+            total = query.count()
+            response['total'] = total
+            response['pages'] = -(-total // per_page)
+
+        return ojsonify(response)
 
     @app.route('/api/products/<int:product_id>', methods=['GET'])
     def get_product(product_id):
-        product = Product.query.get_or_404(product_id)
+        cache_key = f'product:{product_id}'
+        cached = cache_get(cache_key)
+        if cached is not None:
+            return cacheable_response(cached)
+
+        # Select only the columns the response needs instead of hydrating ORM objects
+        product = db.session.execute(
+            select(
+                Product.id, Product.name, Product.description, Product.price_cents, Product.stock, Product.sku,
+                Product.category_id, Category.name.label('category_name'), Product.avg_rating, Product.review_count,
+                Product.created_at, Product.updated_at
+            ).outerjoin(Category, Category.id == Product.category_id).where(Product.id == product_id)
+        ).one_or_none()
+        if product is None:
+            abort(404)
 
         # Get all product images
         images = []
-        for image in product.images:
+        for image in db.session.execute(
+            select(ProductImage.id, ProductImage.image_url, ProductImage.alt_text, ProductImage.is_primary)
+            .where(ProductImage.product_id == product_id)
+        ):
             images.append({
                 'id': image.id,
                 'url': image.image_url,
@@ -232,59 +450,71 @@ def create_app():
                 'is_primary': image.is_primary
             })
 
-        # Get product reviews
+        # Get product reviews along with their authors
         reviews = []
-        for review in product.reviews:
+        for review in db.session.execute(
+            select(Review.id, Review.rating, Review.comment, Review.user_id, User.username, Review.created_at)
+            .join(User, User.id == Review.user_id)
+            .where(Review.product_id == product_id)
+        ):
             reviews.append({
                 'id': review.id,
                 'rating': review.rating,
                 'comment': review.comment,
                 'user_id': review.user_id,
-                'username': review.user.username,
+                'username': review.username,
                 'created_at': review.created_at.isoformat()
             })
 
-        return jsonify({
+        payload = orjson.dumps({
             'id': product.id,
             'name': product.name,
             'description': product.description,
-            'price': str(product.price),
+            'price': str(cents_to_decimal(product.price_cents)),
             'stock': product.stock,
             'sku': product.sku,
             'category_id': product.category_id,
-            'category_name': product.category.name if product.category else None,
+            'category_name': product.category_name,
             'images': images,
             'reviews': reviews,
+            'avg_rating': product.avg_rating,
+            'review_count': product.review_count,
             'created_at': product.created_at.isoformat(),
             'updated_at': product.updated_at.isoformat()
         })
+        cache_set(cache_key, payload, 300)
+
+        return cacheable_response(payload)
 
     @app.route('/api/products', methods=['POST'])
     @jwt_required()
     def create_product():
-        current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(current_user_id)
-
         # Check if user is admin
-        if not user.is_admin:
-            return jsonify({'error': 'Unauthorized'}), 403
+        if not current_user_is_admin():
+            return ojsonify({'error': 'Unauthorized'}, 403)
 
         data = request.get_json()
 
         # Validate required fields
         required_fields = ['name', 'price', 'stock', 'category_id']
         if not all(field in data for field in required_fields):
-            return jsonify({'error': 'Missing required fields'}), 400
+            return ojsonify({'error': 'Missing required fields'}, 400)
+
+        price = parse_price(data['price'])
+        if price is None:
+            return ojsonify({'error': f'Price must be a non-negative amount in whole cents up to {cents_to_decimal(MAX_PRICE_CENTS)}'}, 400)
+        if not category_exists(data['category_id']):
+            return ojsonify({'error': 'Invalid category'}, 400)
 
         # Generate SKU if not provided
         if 'sku' not in data:
-            data['sku'] = f'SKU-{uuid.uuid4().hex[:8].upper()}'
+            data['sku'] = f'SKU-{secrets.token_hex(4).upper()}'
 
         # Create new product
         new_product = Product(
             name=data['name'],
             description=data.get('description', ''),
-            price=Decimal(data['price']),
+            price=price,
             stock=data['stock'],
             sku=data['sku'],
             category_id=data['category_id']
@@ -292,38 +522,43 @@ def create_app():
 
         db.session.add(new_product)
         db.session.commit()
+        cache_delete('categories:v1')
 
-        return jsonify({
+        return ojsonify({
             'message': 'Product created successfully',
             'product': {
                 'id': new_product.id,
                 'name': new_product.name,
-                'price': str(new_product.price),
+                'price': str(cents_to_decimal(new_product.price_cents)),
                 'stock': new_product.stock,
                 'sku': new_product.sku
             }
-        }), 201
+        }, 201)
 
     @app.route('/api/products/<int:product_id>', methods=['PUT'])
     @jwt_required()
     def update_product(product_id):
-        current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(current_user_id)
-
         # Check if user is admin
-        if not user.is_admin:
-            return jsonify({'error': 'Unauthorized'}), 403
+        if not current_user_is_admin():
+            return ojsonify({'error': 'Unauthorized'}, 403)
 
         product = Product.query.get_or_404(product_id)
         data = request.get_json()
 
+        if 'price' in data:
+            price = parse_price(data['price'])
+            if price is None:
+                return ojsonify({'error': f'Price must be a non-negative amount in whole cents up to {cents_to_decimal(MAX_PRICE_CENTS)}'}, 400)
+        if data.get('category_id') is not None and not category_exists(data['category_id']):
+            return ojsonify({'error': 'Invalid category'}, 400)
+
         # Update product fields
         if 'name' in data:
             product.name = data['name']
         if 'description' in data:
             product.description = data['description']
         if 'price' in data:
-            product.price = Decimal(data['price'])
+            product.price = price
         if 'stock' in data:
             product.stock = data['stock']
         if 'category_id' in data:
@@ -332,13 +567,14 @@ def create_app():
             product.is_active = data['is_active']
 
         db.session.commit()
+        cache_delete(f'product:{product_id}', 'categories:v1')
 
-        return jsonify({
+        return ojsonify({
             'message': 'Product updated successfully',
             'product': {
                 'id': product.id,
                 'name': product.name,
-                'price': str(product.price),
+                'price': str(cents_to_decimal(product.price_cents)),
                 'stock': product.stock,
                 'is_active': product.is_active
             }
@@ -347,58 +583,66 @@ def create_app():
     @app.route('/api/products/<int:product_id>', methods=['DELETE'])
     @jwt_required()
     def delete_product(product_id):
-        current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(current_user_id)
-
         # Check if user is admin
-        if not user.is_admin:
-            return jsonify({'error': 'Unauthorized'}), 403
+        if not current_user_is_admin():
+            return ojsonify({'error': 'Unauthorized'}, 403)
 
         product = Product.query.get_or_404(product_id)
 
         # Soft delete by setting is_active to False
         product.is_active = False
         db.session.commit()
+        cache_delete(f'product:{product_id}', 'categories:v1')
 
-        return jsonify({
+        return ojsonify({
             'message': 'Product deleted successfully'
         })
 
     # Category routes
     @app.route('/api/categories', methods=['GET'])
     def get_categories():
-        categories = Category.query.all()
+        cached = cache_get('categories:v1')
+        if cached is not None:
+            return cacheable_response(cached)
+
+        # Count products per category in a single aggregate query
+        rows = (
+            db.session.query(Category, func.count(Product.id))
+            .outerjoin(Product, Product.category_id == Category.id)
+            .group_by(Category.id)
+            .all()
+        )
         result = []
 
-        for category in categories:
+        for category, product_count in rows:
             result.append({
                 'id': category.id,
                 'name': category.name,
                 'description': category.description,
-                'product_count': category.products.count()
+                'product_count': product_count
             })
 
-        return jsonify({'categories': result})
+        payload = orjson.dumps({'categories': result})
+        cache_set('categories:v1', payload, 60)
+
+        return cacheable_response(payload)
 
     @app.route('/api/categories', methods=['POST'])
     @jwt_required()
     def create_category():
-        current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(current_user_id)
-
         # Check if user is admin
-        if not user.is_admin:
-            return jsonify({'error': 'Unauthorized'}), 403
+        if not current_user_is_admin():
+            return ojsonify({'error': 'Unauthorized'}, 403)
 
         data = request.get_json()
 
         # Validate required fields
         if 'name' not in data:
-            return jsonify({'error': 'Category name is required'}), 400
+            return ojsonify({'error': 'Category name is required'}, 400)
 
         # Check if category already exists
-        if Category.query.filter_by(name=data['name']).first():
-            return jsonify({'error': 'Category already exists'}), 400
+        if db.session.query(Category.query.filter_by(name=data['name']).exists()).scalar():
+            return ojsonify({'error': 'Category already exists'}, 400)
 
         # Create new category
         new_category = Category(
@@ -408,55 +652,61 @@ def create_app():
 
         db.session.add(new_category)
         db.session.commit()
+        cache_delete('categories:v1')
 
-        return jsonify({
+        return ojsonify({
             'message': 'Category created successfully',
             'category': {
                 'id': new_category.id,
                 'name': new_category.name,
                 'description': new_category.description
             }
-        }), 201
+        }, 201)
 
     # Cart routes
     @app.route('/api/cart', methods=['GET'])
     @jwt_required()
     def get_cart():
-        current_user_id = get_jwt_identity()
-        cart_items = CartItem.query.filter_by(user_id=current_user_id).all()
+        current_user_id = int(get_jwt_identity())
+
+        # Fetch cart lines with their products and line totals in one query
+        rows = db.session.query(
+            CartItem.id,
+            CartItem.product_id,
+            Product.name,
+            CartItem.quantity,
+            Product.price_cents,
+            (cast(Product.price_cents, db.BigInteger) * CartItem.quantity).label('line_total_cents')
+        ).join(Product, Product.id == CartItem.product_id).filter(CartItem.user_id == current_user_id).all()
 
         result = []
-        total = Decimal('0.00')
-
-        for item in cart_items:
-            product = item.product
-            item_total = product.price * item.quantity
-            total += item_total
+        total_cents = sum(row.line_total_cents for row in rows)
 
+        for row in rows:
             result.append({
-                'id': item.id,
-                'product_id': product.id,
-                'product_name': product.name,
-                'quantity': item.quantity,
-                'price': str(product.price),
-                'total': str(item_total)
+                'id': row.id,
+                'product_id': row.product_id,
+                'product_name': row.name,
+                'quantity': row.quantity,
+                'price': str(cents_to_decimal(row.price_cents)),
+                'total': str(cents_to_decimal(row.line_total_cents))
             })
 
-        return jsonify({
+        return ojsonify({
             'cart_items': result,
-            'total': str(total),
+            'total': str(cents_to_decimal(total_cents)),
             'items_count': len(result)
         })
 
     @app.route('/api/cart', methods=['POST'])
     @jwt_required()
     def add_to_cart():
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         data = request.get_json()
 
         # Validate required fields
         if 'product_id' not in data or 'quantity' not in data:
-            return jsonify({'error': 'Product ID and quantity are required'}), 400
+            return ojsonify({'error': 'Product ID and quantity are required'}, 400)
 
         product_id = data['product_id']
         quantity = int(data['quantity'])
@@ -464,34 +714,30 @@ def create_app():
         # Check if product exists and is active
         product = Product.query.filter_by(id=product_id, is_active=True).first()
         if not product:
-            return jsonify({'error': 'Product not found or unavailable'}), 404
+            return ojsonify({'error': 'Product not found or unavailable'}, 404)
 
         # Check if quantity is valid
         if quantity <= 0:
-            return jsonify({'error': 'Quantity must be greater than zero'}), 400
+            return ojsonify({'error': 'Quantity must be greater than zero'}, 400)
 
         # Check if product is in stock
         if product.stock < quantity:
-            return jsonify({'error': 'Not enough stock available'}), 400
-
-        # Check if item already in cart
-        cart_item = CartItem.query.filter_by(user_id=current_user_id, product_id=product_id).first()
-
-        if cart_item:
-            # Update quantity
-            cart_item.quantity += quantity
-        else:
-            # Add new item to cart
-            cart_item = CartItem(
-                user_id=current_user_id,
-                product_id=product_id,
-                quantity=quantity
-            )
-            db.session.add(cart_item)
+            return ojsonify({'error': 'Not enough stock available'}, 400)
 
+        # Add the item, or bump its quantity if it is already in the cart, in one statement
+        stmt = upsert_insert(CartItem).values(
+            user_id=current_user_id,
+            product_id=product_id,
+            quantity=quantity
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'product_id'],
+            set_={'quantity': CartItem.quantity + stmt.excluded.quantity}
+        ).returning(CartItem.id, CartItem.quantity)
+        cart_item = db.session.execute(stmt).one()
         db.session.commit()
 
-        return jsonify({
+        return ojsonify({
             'message': 'Product added to cart',
             'cart_item': {
                 'id': cart_item.id,
@@ -503,32 +749,32 @@ def create_app():
     @app.route('/api/cart/<int:item_id>', methods=['PUT'])
     @jwt_required()
     def update_cart_item(item_id):
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         cart_item = CartItem.query.filter_by(id=item_id, user_id=current_user_id).first()
 
         if not cart_item:
-            return jsonify({'error': 'Cart item not found'}), 404
+            return ojsonify({'error': 'Cart item not found'}, 404)
 
         data = request.get_json()
 
         if 'quantity' not in data:
-            return jsonify({'error': 'Quantity is required'}), 400
+            return ojsonify({'error': 'Quantity is required'}, 400)
 
         quantity = int(data['quantity'])
 
         # Check if quantity is valid
         if quantity <= 0:
-            return jsonify({'error': 'Quantity must be greater than zero'}), 400
+            return ojsonify({'error': 'Quantity must be greater than zero'}, 400)
 
         # Check if product is in stock
         if cart_item.product.stock < quantity:
-            return jsonify({'error': 'Not enough stock available'}), 400
+            return ojsonify({'error': 'Not enough stock available'}, 400)
 
         # Update quantity
         cart_item.quantity = quantity
         db.session.commit()
 
-        return jsonify({
+        return ojsonify({
             'message': 'Cart item updated',
             'cart_item': {
                 'id': cart_item.id,
@@ -540,16 +786,16 @@ def create_app():
     @app.route('/api/cart/<int:item_id>', methods=['DELETE'])
     @jwt_required()
     def remove_from_cart(item_id):
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         cart_item = CartItem.query.filter_by(id=item_id, user_id=current_user_id).first()
 
         if not cart_item:
-            return jsonify({'error': 'Cart item not found'}), 404
+            return ojsonify({'error': 'Cart item not found'}, 404)
 
         db.session.delete(cart_item)
         db.session.commit()
 
-        return jsonify({
+        return ojsonify({
             'message': 'Item removed from cart'
         })
 
@@ -557,136 +803,187 @@ def create_app():
     @app.route('/api/orders', methods=['POST'])
     @jwt_required()
     def create_order():
-        current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(current_user_id)
+        current_user_id = int(get_jwt_identity())
         data = request.get_json()
 
         # Validate required fields
         if 'shipping_address_id' not in data:
-            return jsonify({'error': 'Shipping address is required'}), 400
-
-        # Check if address belongs to user
-        shipping_address = Address.query.filter_by(id=data['shipping_address_id'], user_id=current_user_id).first()
-        if not shipping_address:
-            return jsonify({'error': 'Invalid shipping address'}), 400
+            return ojsonify({'error': 'Shipping address is required'}, 400)
 
-        # Get billing address
-        billing_address_id = data.get('billing_address_id', data['shipping_address_id'])
-        billing_address = Address.query.filter_by(id=billing_address_id, user_id=current_user_id).first()
-        if not billing_address:
-            return jsonify({'error': 'Invalid billing address'}), 400
+        # Ids that aren't integers can't match an address; reject them like unknown ones
+        try:
+            shipping_address_id = int(data['shipping_address_id'])
+        except (TypeError, ValueError):
+            return ojsonify({'error': 'Invalid shipping address'}, 400)
+        try:
+            billing_address_id = int(data.get('billing_address_id', shipping_address_id))
+        except (TypeError, ValueError):
+            return ojsonify({'error': 'Invalid billing address'}, 400)
+
+        # Check both addresses belong to the user in one query
+        owned_address_ids = set(db.session.scalars(
+            select(Address.id).where(
+                Address.user_id == current_user_id,
+                Address.id.in_({shipping_address_id, billing_address_id})
+            )
+        ))
+        if shipping_address_id not in owned_address_ids:
+            return ojsonify({'error': 'Invalid shipping address'}, 400)
+        if billing_address_id not in owned_address_ids:
+            return ojsonify({'error': 'Invalid billing address'}, 400)
 
         # Get cart items
         cart_items = CartItem.query.filter_by(user_id=current_user_id).all()
         if not cart_items:
-            return jsonify({'error': 'Cart is empty'}), 400
+            return ojsonify({'error': 'Cart is empty'}, 400)
 
-        # Create order
-        order_number = f'ORD-{uuid.uuid4().hex[:8].upper()}'
-        total_amount = Decimal('0.00')
+        # Quantity requested per product
+        quantities = {}
+        for cart_item in cart_items:
+            quantities[cart_item.product_id] = quantities.get(cart_item.product_id, 0) + cart_item.quantity
+
+        # Lock all ordered products in one query (in id order to avoid deadlocks)
+        products = {
+            product.id: product
+            for product in Product.query.filter(Product.id.in_(quantities))
+            .order_by(Product.id).with_for_update().all()
+        }
+
+        # Check every product is still available and has enough stock before writing anything
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            if not product.is_active or product.stock < quantity:
+                db.session.rollback()
+                return ojsonify({
+                    'error': f'Product {product.name} is not available or not enough in stock'
+                }, 400)
+
+        total_amount_cents = sum(
+            products[cart_item.product_id].price_cents * cart_item.quantity for cart_item in cart_items
+        )
 
         # Create order
+        order_number = f'ORD-{secrets.token_hex(4).upper()}'
         new_order = Order(
             order_number=order_number,
             status='pending',
-            total_amount=total_amount,  # Will be updated later
+            total_amount_cents=total_amount_cents,
             user_id=current_user_id,
-            shipping_address_id=shipping_address.id,
-            billing_address_id=billing_address.id
+            shipping_address_id=shipping_address_id,
+            billing_address_id=billing_address_id
         )
 
         db.session.add(new_order)
         db.session.flush()  # Get order ID without committing
 
-        # Create order items and update stock
-        for cart_item in cart_items:
-            product = cart_item.product
-
-            # Check if product is still available and has enough stock
-            if not product.is_active or product.stock < cart_item.quantity:
-                db.session.rollback()
-                return jsonify({
-                    'error': f'Product {product.name} is not available or not enough in stock'
-                }), 400
-
-            # Create order item
-            order_item = OrderItem(
-                order_id=new_order.id,
-                product_id=product.id,
-                quantity=cart_item.quantity,
-                price=product.price
-            )
-
-            # Update stock
-            product.stock -= cart_item.quantity
-
-            # Update total amount
-            item_total = product.price * cart_item.quantity
-            total_amount += item_total
-
-            db.session.add(order_item)
+        # Create order items with one Core executemany INSERT
+        db.session.execute(
+            insert(OrderItem.__table__),
+            [
+                {
+                    'order_id': new_order.id,
+                    'product_id': cart_item.product_id,
+                    'quantity': cart_item.quantity,
+                    'price_cents': products[cart_item.product_id].price_cents
+                }
+                for cart_item in cart_items
+            ]
+        )
 
-        # Update order total
-        new_order.total_amount = total_amount
+        # Update stock for all products in a single executemany UPDATE
+        products_table = Product.__table__
+        db.session.execute(
+            update(products_table)
+            .where(products_table.c.id == bindparam('product_id'))
+            .values(stock=products_table.c.stock - bindparam('quantity')),
+            [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in quantities.items()]
+        )
 
         # Clear cart
-        for cart_item in cart_items:
-            db.session.delete(cart_item)
+        CartItem.query.filter_by(user_id=current_user_id).delete(synchronize_session=False)
 
         db.session.commit()
 
-        return jsonify({
+        # Stock changed, so drop the cached product pages
+        cache_delete(*[f'product:{product_id}' for product_id in quantities])
+
+        return ojsonify({
             'message': 'Order created successfully',
             'order': {
                 'id': new_order.id,
                 'order_number': new_order.order_number,
                 'status': new_order.status,
-                'total_amount': str(new_order.total_amount),
+                'total_amount': str(cents_to_decimal(new_order.total_amount_cents)),
                 'created_at': new_order.created_at.isoformat()
             }
-        }), 201
+        }, 201)
 
     @app.route('/api/orders', methods=['GET'])
     @jwt_required()
     def get_user_orders():
-        current_user_id = get_jwt_identity()
-        orders = Order.query.filter_by(user_id=current_user_id).order_by(Order.created_at.desc()).all()
-
-        result = []
-        for order in orders:
-            result.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'status': order.status,
-                'total_amount': str(order.total_amount),
-                'created_at': order.created_at.isoformat(),
-                'items_count': order.order_items.count()
-            })
+        current_user_id = int(get_jwt_identity())
+        items_count = (
+            select(func.count())
+            .where(OrderItem.order_id == Order.id)
+            .correlate(Order)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(*Order.list_columns(), items_count.label('items_count'))
+            .where(Order.user_id == current_user_id)
+            .order_by(Order.created_at.desc())
+            .execution_options(yield_per=500)
+        )
 
-        return jsonify({
-            'orders': result
-        })
+        # Stream the history in batches instead of building the whole list in memory
+        def generate():
+            yield b'{"orders":['
+            first = True
+            for order in db.session.execute(stmt):
+                if not first:
+                    yield b','
+                first = False
+                yield orjson.dumps({
+                    'id': order.id,
+                    'order_number': order.order_number,
+                    'status': order.status,
+                    'total_amount': str(cents_to_decimal(order.total_amount_cents)),
+                    'created_at': order.created_at.isoformat(),
+                    'items_count': order.items_count
+                })
+            yield b']}'
+
+        return Response(stream_with_context(generate()), mimetype='application/json')
 
     @app.route('/api/orders/<int:order_id>', methods=['GET'])
     @jwt_required()
     def get_order_details(order_id):
-        current_user_id = get_jwt_identity()
-        order = Order.query.filter_by(id=order_id, user_id=current_user_id).first()
+        current_user_id = int(get_jwt_identity())
+
+        # Load the order, both addresses and every item with its product name in one round trip
+        rows = db.session.query(Order, OrderItem, Product.name).options(
+            joinedload(Order.shipping_address),
+            joinedload(Order.billing_address)
+        ).outerjoin(OrderItem, OrderItem.order_id == Order.id).outerjoin(
+            Product, Product.id == OrderItem.product_id
+        ).filter(Order.id == order_id, Order.user_id == current_user_id).order_by(OrderItem.product_id).all()
+
+        if not rows:
+            return ojsonify({'error': 'Order not found'}, 404)
 
-        if not order:
-            return jsonify({'error': 'Order not found'}), 404
+        order = rows[0][0]
 
         # Get order items
         items = []
-        for item in order.order_items:
-            product = item.product
+        for _, item, product_name in rows:
+            if item is None:
+                continue
             items.append({
-                'id': item.id,
-                'product_id': product.id,
-                'product_name': product.name,
+                'product_id': item.product_id,
+                'product_name': product_name,
                 'quantity': item.quantity,
-                'price': str(item.price),
-                'total': str(item.price * item.quantity)
+                'price': str(cents_to_decimal(item.price_cents)),
+                'total': str(cents_to_decimal(item.price_cents * item.quantity))
             })
 
         # Get shipping address
@@ -709,11 +1006,11 @@ def create_app():
             'zip_code': billing_address.zip_code
         }
 
-        return jsonify({
+        return ojsonify({
             'id': order.id,
             'order_number': order.order_number,
             'status': order.status,
-            'total_amount': str(order.total_amount),
+            'total_amount': str(cents_to_decimal(order.total_amount_cents)),
             'created_at': order.created_at.isoformat(),
             'updated_at': order.updated_at.isoformat(),
             'items': items,
@@ -725,37 +1022,41 @@ def create_app():
     @app.route('/api/products/<int:product_id>/reviews', methods=['POST'])
     @jwt_required()
     def create_review(product_id):
-        current_user_id = get_jwt_identity()
-        product = Product.query.get_or_404(product_id)
+        current_user_id = int(get_jwt_identity())
+        if not Product.exists_cached(product_id):
+            abort(404)
         data = request.get_json()
 
         # Validate required fields
         if 'rating' not in data:
-            return jsonify({'error': 'Rating is required'}), 400
+            return ojsonify({'error': 'Rating is required'}, 400)
 
         rating = int(data['rating'])
 
         # Validate rating
         if rating < 1 or rating > 5:
-            return jsonify({'error': 'Rating must be between 1 and 5'}), 400
-
-        # Check if user already reviewed this product
-        existing_review = Review.query.filter_by(user_id=current_user_id, product_id=product_id).first()
-        if existing_review:
-            return jsonify({'error': 'You have already reviewed this product'}), 400
+            return ojsonify({'error': 'Rating must be between 1 and 5'}, 400)
 
-        # Create review
-        new_review = Review(
-            user_id=current_user_id,
-            product_id=product_id,
-            rating=rating,
-            comment=data.get('comment', '')
-        )
-
-        db.session.add(new_review)
+        # Create review; the unique (product_id, user_id) constraint rejects a second one
+        new_review = db.session.execute(
+            upsert_insert(Review).values(
+                user_id=current_user_id,
+                product_id=product_id,
+                rating=rating,
+                comment=data.get('comment', '')
+            ).on_conflict_do_nothing(
+                index_elements=['product_id', 'user_id']
+            ).returning(Review.id, Review.rating, Review.comment, Review.created_at)
+        ).one_or_none()
+        if new_review is None:
+            db.session.rollback()
+            return ojsonify({'error': 'You have already reviewed this product'}, 400)
+
+        refresh_product_rating(db.session.connection(), product_id)
         db.session.commit()
+        cache_delete(f'product:{product_id}')
 
-        return jsonify({
+        return ojsonify({
             'message': 'Review created successfully',
             'review': {
                 'id': new_review.id,
@@ -763,13 +1064,13 @@ def create_app():
                 'comment': new_review.comment,
                 'created_at': new_review.created_at.isoformat()
             }
-        }), 201
+        }, 201)
 
     # Address routes
     @app.route('/api/addresses', methods=['GET'])
     @jwt_required()
     def get_user_addresses():
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         addresses = Address.query.filter_by(user_id=current_user_id).all()
 
         result = []
@@ -785,20 +1086,20 @@ def create_app():
                 'address_type': address.address_type
             })
 
-        return jsonify({
+        return ojsonify({
             'addresses': result
         })
 
     @app.route('/api/addresses', methods=['POST'])
     @jwt_required()
     def create_address():
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         data = request.get_json()
 
         # Validate required fields
         required_fields = ['street', 'city', 'country', 'zip_code']
         if not all(field in data for field in required_fields):
-            return jsonify({'error': 'Missing required fields'}), 400
+            return ojsonify({'error': 'Missing required fields'}, 400)
 
         # Create address
         new_address = Address(
@@ -812,15 +1113,18 @@ def create_app():
             address_type=data.get('address_type', '')
         )
 
-        # If this is the first address or is set as default, update other addresses
-        if new_address.is_default or Address.query.filter_by(user_id=current_user_id).count() == 0:
+        # A new default address replaces the old one; the first address always becomes the default
+        if new_address.is_default:
+            db.session.execute(
+                update(Address).where(Address.user_id == current_user_id).values(is_default=False)
+            )
+        elif not Address.query.filter_by(user_id=current_user_id).with_entities(Address.id).limit(1).first():
             new_address.is_default = True
-            Address.query.filter_by(user_id=current_user_id).update({'is_default': False})
 
         db.session.add(new_address)
         db.session.commit()
 
-        return jsonify({
+        return ojsonify({
             'message': 'Address created successfully',
             'address': {
                 'id': new_address.id,
@@ -832,7 +1136,7 @@ def create_app():
                 'is_default': new_address.is_default,
                 'address_type': new_address.address_type
             }
-        }), 201
+        }, 201)
 
     return app
 
@@ -1,3 +1,5 @@
+from flask_bcrypt import Bcrypt
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+bcrypt = Bcrypt()
\ No newline at end of file
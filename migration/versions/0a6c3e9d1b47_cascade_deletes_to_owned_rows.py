@@ -0,0 +1,42 @@
+"""cascade deletes to owned rows
+
+Revision ID: 0a6c3e9d1b47
+Revises: f2d8a4c6e095
+Create Date: 2026-10-15 15:10:44.728160
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6c3e9d1b47'
+down_revision: Union[str, None] = 'f2d8a4c6e095'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referenced table); constraint names are the Postgres defaults from the initial migration
+CASCADE_FOREIGN_KEYS = (
+    ('addresses', 'user_id', 'users'),
+    ('cart_items', 'user_id', 'users'),
+    ('order_items', 'order_id', 'orders'),
+    ('product_images', 'product_id', 'products'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column, referenced in CASCADE_FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referenced, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column, referenced in reversed(CASCADE_FOREIGN_KEYS):
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referenced, [column], ['id'])
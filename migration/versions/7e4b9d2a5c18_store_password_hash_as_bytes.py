@@ -0,0 +1,38 @@
+"""store password hash as bytes
+
+Revision ID: 7e4b9d2a5c18
+Revises: 0a6c3e9d1b47
+Create Date: 2026-10-15 15:46:13.352907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e4b9d2a5c18'
+down_revision: Union[str, None] = '0a6c3e9d1b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('users', 'password',
+               existing_type=sa.String(length=128),
+               type_=sa.LargeBinary(length=60),
+               existing_nullable=False,
+               postgresql_using="convert_to(password, 'UTF8')")
+    op.alter_column('users', 'password', new_column_name='password_hash')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('users', 'password_hash', new_column_name='password')
+    op.alter_column('users', 'password',
+               existing_type=sa.LargeBinary(length=60),
+               type_=sa.String(length=128),
+               existing_nullable=False,
+               postgresql_using="convert_from(password, 'UTF8')")
@@ -0,0 +1,53 @@
+"""key order items by order and product
+
+Revision ID: a1f6d9b3c748
+Revises: d3a8c5f1e602
+Create Date: 2026-10-15 16:57:31.446021
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1f6d9b3c748'
+down_revision: Union[str, None] = 'd3a8c5f1e602'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Merge any repeated product lines within an order into the first one
+    op.execute("""
+        UPDATE order_items SET quantity = dup.total
+        FROM (
+            SELECT min(id) AS id, sum(quantity) AS total
+            FROM order_items
+            GROUP BY order_id, product_id
+            HAVING count(*) > 1
+        ) AS dup
+        WHERE order_items.id = dup.id
+    """)
+    op.execute("""
+        DELETE FROM order_items USING order_items AS keep
+        WHERE order_items.order_id = keep.order_id
+          AND order_items.product_id = keep.product_id
+          AND order_items.id > keep.id
+    """)
+
+    op.drop_constraint('order_items_pkey', 'order_items', type_='primary')
+    op.drop_column('order_items', 'id')
+    op.create_primary_key('order_items_pkey', 'order_items', ['order_id', 'product_id'])
+    # The primary key now leads with order_id
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+    op.drop_constraint('order_items_pkey', 'order_items', type_='primary')
+    op.execute('ALTER TABLE order_items ADD COLUMN id SERIAL')
+    op.create_primary_key('order_items_pkey', 'order_items', ['id'])
@@ -0,0 +1,45 @@
+"""store money as integer cents
+
+Revision ID: b4e7d2c9f513
+Revises: 5d1f8e3a6c27
+Create Date: 2026-10-15 12:41:09.663185
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e7d2c9f513'
+down_revision: Union[str, None] = '5d1f8e3a6c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Order totals go up to 99,999,999.99, past the int4 range once counted in cents
+    for table, column, type_, sql_type in (('products', 'price', sa.Integer(), 'integer'),
+                                           ('order_items', 'price', sa.Integer(), 'integer'),
+                                           ('orders', 'total_amount', sa.BigInteger(), 'bigint')):
+        op.alter_column(table, column,
+               existing_type=sa.Numeric(precision=10, scale=2),
+               type_=type_,
+               existing_nullable=False,
+               postgresql_using=f'round({column} * 100)::{sql_type}')
+        op.alter_column(table, column, new_column_name=f'{column}_cents')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column, existing_type in (('orders', 'total_amount', sa.BigInteger()),
+                                         ('order_items', 'price', sa.Integer()),
+                                         ('products', 'price', sa.Integer())):
+        op.alter_column(table, f'{column}_cents', new_column_name=column)
+        op.alter_column(table, column,
+               existing_type=existing_type,
+               type_=sa.Numeric(precision=10, scale=2),
+               existing_nullable=False,
+               postgresql_using=f'{column} / 100.0')
@@ -0,0 +1,47 @@
+"""default timestamps on the server
+
+Revision ID: e6a3f0b8d241
+Revises: b4e7d2c9f513
+Create Date: 2026-10-15 13:18:35.170442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a3f0b8d241'
+down_revision: Union[str, None] = 'b4e7d2c9f513'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_COLUMNS = (
+    ('users', 'created_at'),
+    ('users', 'updated_at'),
+    ('products', 'created_at'),
+    ('products', 'updated_at'),
+    ('orders', 'created_at'),
+    ('orders', 'updated_at'),
+    ('reviews', 'created_at'),
+    ('cart_items', 'added_at'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column,
+               existing_type=sa.DateTime(),
+               server_default=sa.text("timezone('utc', now())"),
+               existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in reversed(TIMESTAMP_COLUMNS):
+        op.alter_column(table, column,
+               existing_type=sa.DateTime(),
+               server_default=None,
+               existing_nullable=True)
@@ -0,0 +1,54 @@
+"""constrain review rating and order status
+
+Revision ID: f2d8a4c6e095
+Revises: c9b1e5a7d3f2
+Create Date: 2026-10-15 14:39:27.095318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d8a4c6e095'
+down_revision: Union[str, None] = 'c9b1e5a7d3f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+order_status = postgresql.ENUM('pending', 'processing', 'shipped', 'delivered', 'cancelled', name='order_status')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('reviews', 'rating',
+               existing_type=sa.Integer(),
+               type_=sa.SmallInteger(),
+               existing_nullable=False)
+    op.create_check_constraint('ck_reviews_rating_range', 'reviews', 'rating BETWEEN 1 AND 5')
+
+    order_status.create(op.get_bind())
+    op.execute("UPDATE orders SET status = 'pending' WHERE status IS NULL")
+    op.alter_column('orders', 'status',
+               existing_type=sa.String(length=20),
+               type_=order_status,
+               nullable=False,
+               postgresql_using='status::order_status')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('orders', 'status',
+               existing_type=order_status,
+               type_=sa.String(length=20),
+               nullable=True,
+               postgresql_using='status::text')
+    order_status.drop(op.get_bind())
+
+    op.drop_constraint('ck_reviews_rating_range', 'reviews', type_='check')
+    op.alter_column('reviews', 'rating',
+               existing_type=sa.SmallInteger(),
+               type_=sa.Integer(),
+               existing_nullable=False)
@@ -1,53 +1,182 @@
-from datetime import datetime
-from extensions import db
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+from cachetools import TTLCache
+from sqlalchemy import event, inspect, lambda_stmt, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, column_property, object_session
+from sqlalchemy.sql.expression import FunctionElement
+from extensions import db, bcrypt
+
+
+# Money is stored as integer cents; these convert at the Decimal boundary.
+# Prices are int4 columns, so MAX_PRICE_CENTS bounds what a single price may hold.
+MAX_PRICE_CENTS = 2**31 - 1
+
+
+def cents_to_decimal(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def decimal_to_cents(value):
+    return int((Decimal(value) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+# Decimal view over an integer cents column, e.g. price over price_cents
+def cents_property(column_name):
+    return property(
+        lambda self: cents_to_decimal(getattr(self, column_name)),
+        lambda self, value: setattr(self, column_name, decimal_to_cents(value))
+    )
+
+
+# Current UTC time as a naive timestamp, whatever the session time zone of the connection
+class utcnow(FunctionElement):
+    type = db.DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow, 'postgresql')
+def _pg_utcnow(element, compiler, **kw):
+    return "timezone('utc', now())"
+
+
+# SQLite's CURRENT_TIMESTAMP is already UTC
+@compiles(utcnow)
+def _default_utcnow(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+
+# Process-local snapshots of rarely-changing rows. They hold plain dicts rather than
+# ORM instances so they can be shared across sessions; ORM writes evict them once committed.
+_snapshot_lock = threading.Lock()
+_category_cache = TTLCache(maxsize=1024, ttl=300)
+_product_cache = TTLCache(maxsize=4096, ttl=300)
+# Bumped on every eviction, keyed by (id(cache), key); a load that straddles an eviction
+# may have read the old row, so its result is returned but not stored
+_snapshot_generations = {}
+
+
+def _cached_snapshot(cache, key, load):
+    with _snapshot_lock:
+        snapshot = cache.get(key)
+        generation = _snapshot_generations.get((id(cache), key), 0)
+    if snapshot is None:
+        snapshot = load()
+        if snapshot is not None:
+            with _snapshot_lock:
+                if _snapshot_generations.get((id(cache), key), 0) == generation:
+                    cache[key] = snapshot
+    return snapshot
+
+
+def _evict_snapshot(cache, key):
+    with _snapshot_lock:
+        cache.pop(key, None)
+        _snapshot_generations[(id(cache), key)] = _snapshot_generations.get((id(cache), key), 0) + 1
+
+
+# Evicting at flush would let another request re-cache the old row before the
+# transaction commits, so changed keys wait on the session until after_commit
+def _queue_eviction(cache, target):
+    object_session(target).info.setdefault('snapshot_evictions', []).append((cache, target.id))
+
+
 class User(db.Model):
     __tablename__ = 'users'
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
-    password = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.LargeBinary(60), nullable=False)  # bcrypt hash, always 60 bytes
     first_name = db.Column(db.String(64))
     last_name = db.Column(db.String(64))
     is_active = db.Column(db.Boolean, default=True)
     is_admin = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    password = db.Column(db.String(128), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+    updated_at = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
 
 
     # Relationships
-    addresses = db.relationship('Address', backref='user', lazy='dynamic', cascade='all, delete-orphan')
-    orders = db.relationship('Order', backref='user', lazy='dynamic')
-    reviews = db.relationship('Review', backref='user', lazy='dynamic')
-    cart_items = db.relationship('CartItem', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    addresses = db.relationship('Address', back_populates='user', lazy='select', cascade='all, delete-orphan', passive_deletes=True)
+    orders = db.relationship('Order', back_populates='user', lazy='select')
+    reviews = db.relationship('Review', back_populates='user', lazy='select')
+    cart_items = db.relationship('CartItem', back_populates='user', lazy='select', cascade='all, delete-orphan', passive_deletes=True)
+
+    def set_password(self, password):
+        self.password_hash = bcrypt.generate_password_hash(password)
+
+    # Email lookups run on every login and profile update; lambda_stmt caches building the statement
+    @classmethod
+    def by_email(cls, email):
+        return db.session.scalars(lambda_stmt(lambda: select(User).where(User.email == email))).first()
+
+    # Just the columns login needs
+    @classmethod
+    def login_row(cls, email):
+        return db.session.execute(lambda_stmt(
+            lambda: select(
+                User.id, User.username, User.email, User.first_name, User.last_name, User.password_hash, User.is_admin
+            ).where(User.email == email)
+        )).first()
 
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Keyset pagination over active products, optionally within a category
+        db.Index('ix_products_active_id', 'is_active', 'id'),
+        db.Index('ix_products_active_category_id', 'is_active', 'category_id', 'id'),
+        # Name lookups only ever concern the live catalog
+        db.Index('ix_products_active_name', 'name', postgresql_where=db.text('is_active')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(255), nullable=False, index=True)
+    name = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
-    price = db.Column(db.Numeric(10, 2), nullable=False)
+    price_cents = db.Column(db.Integer, nullable=False)
     stock = db.Column(db.Integer, default=0)
     sku = db.Column(db.String(64), unique=True, index=True)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+    updated_at = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
+
+    # Denormalized from product_images and reviews; kept current by the listeners at the bottom
+    primary_image_url = db.Column(db.String(255))
+    avg_rating = db.Column(db.Float, nullable=False, server_default='0')
+    review_count = db.Column(db.Integer, nullable=False, server_default='0')
     
     # Foreign keys
-    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), index=True)
     
     # Relationships
-    order_items = db.relationship('OrderItem', backref='product', lazy='dynamic')
-    reviews = db.relationship('Review', backref='product', lazy='dynamic')
-    cart_items = db.relationship('CartItem', backref='product', lazy='dynamic')
-    images = db.relationship('ProductImage', backref='product', lazy='dynamic', cascade='all, delete-orphan')
+    category = db.relationship('Category', back_populates='products', lazy='select')
+    order_items = db.relationship('OrderItem', back_populates='product', lazy='select')
+    reviews = db.relationship('Review', back_populates='product', lazy='select')
+    cart_items = db.relationship('CartItem', back_populates='product', lazy='select')
+    images = db.relationship('ProductImage', back_populates='product', lazy='select', cascade='all, delete-orphan', passive_deletes=True)
+
+    price = cents_property('price_cents')
+
+    # Existence only, for writes that hang rows off a product; catalog reads go to the database
+    @classmethod
+    def exists_cached(cls, product_id):
+        def load():
+            row = db.session.execute(db.select(cls.id).where(cls.id == product_id)).one_or_none()
+            return row._asdict() if row else None
+        return _cached_snapshot(_product_cache, product_id, load) is not None
+
+    # Columns rendered by the product listing
+    @classmethod
+    def list_columns(cls):
+        return (cls.id, cls.name, cls.description, cls.price_cents, cls.stock, cls.sku, cls.category_id,
+                cls.primary_image_url, cls.avg_rating, cls.review_count, cls.created_at)
 
 
 class Address(db.Model):
     __tablename__ = 'addresses'
+    __table_args__ = (
+        db.Index('ix_addresses_user_default', 'user_id', 'is_default'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     street = db.Column(db.String(128), nullable=False)
@@ -59,7 +188,10 @@ class Address(db.Model):
     address_type = db.Column(db.String(20))  # 'shipping' or 'billing'
     
     # Foreign keys
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+
+    # Relationships
+    user = db.relationship('User', back_populates='addresses', lazy='select')
 
 
 class Category(db.Model):
@@ -70,18 +202,37 @@ class Category(db.Model):
     description = db.Column(db.Text)
     
     # Relationships
-    products = db.relationship('Product', backref='category', lazy='dynamic')
+    products = db.relationship('Product', back_populates='category', lazy='select')
+
+    @classmethod
+    def get_cached(cls, category_id):
+        def load():
+            row = db.session.execute(
+                db.select(cls.id, cls.name, cls.description).where(cls.id == category_id)
+            ).one_or_none()
+            return row._asdict() if row else None
+        return _cached_snapshot(_category_cache, category_id, load)
 
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Order history per user, newest first (read as a backward index scan)
+        db.Index('ix_orders_user_created_at', 'user_id', 'created_at'),
+        # Orders are appended in time order, so a tiny BRIN index serves created_at range scans
+        db.Index('ix_orders_created_at_brin', 'created_at', postgresql_using='brin'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(20), unique=True, nullable=False)
-    status = db.Column(db.String(20), default='pending')  # pending, processing, shipped, delivered, cancelled
-    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    status = db.Column(
+        db.Enum('pending', 'processing', 'shipped', 'delivered', 'cancelled', name='order_status'),
+        default='pending',
+        nullable=False
+    )
+    total_amount_cents = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+    updated_at = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
     
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -89,50 +240,85 @@ class Order(db.Model):
     billing_address_id = db.Column(db.Integer, db.ForeignKey('addresses.id'))
     
     # Relationships
-    order_items = db.relationship('OrderItem', backref='order', lazy='dynamic', cascade='all, delete-orphan')
+    user = db.relationship('User', back_populates='orders', lazy='select')
+    order_items = db.relationship('OrderItem', back_populates='order', lazy='select', cascade='all, delete-orphan', passive_deletes=True)
     shipping_address = db.relationship('Address', foreign_keys=[shipping_address_id])
     billing_address = db.relationship('Address', foreign_keys=[billing_address_id])
 
+    # Columns rendered by the order history
+    @classmethod
+    def list_columns(cls):
+        return (cls.id, cls.order_number, cls.status, cls.total_amount_cents, cls.created_at)
+
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    # An order holds each product once; the key also serves "items in order X"
+    __table_args__ = (
+        db.PrimaryKeyConstraint('order_id', 'product_id'),
+    )
     
-    id = db.Column(db.Integer, primary_key=True)
     quantity = db.Column(db.Integer, nullable=False)
-    price = db.Column(db.Numeric(10, 2), nullable=False)  # Price at time of purchase
+    price_cents = db.Column(db.Integer, nullable=False)  # Price at time of purchase
     
     # Foreign keys
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+
+    # Relationships
+    order = db.relationship('Order', back_populates='order_items', lazy='select')
+    product = db.relationship('Product', back_populates='order_items', lazy='select')
 
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # One review per user and product; product_id leads so it also serves the product page
+        db.UniqueConstraint('product_id', 'user_id', name='uq_reviews_product_user'),
+        db.CheckConstraint('rating BETWEEN 1 AND 5', name='ck_reviews_rating_range'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    rating = db.Column(db.Integer, nullable=False)  # 1-5 stars
+    rating = db.Column(db.SmallInteger, nullable=False)  # 1-5 stars
     comment = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
     
     # Foreign keys
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    # active_history loads the old value on reassignment so the product it left can be refreshed
+    product_id = column_property(db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False), active_history=True)
+
+    # Relationships
+    user = db.relationship('User', back_populates='reviews', lazy='select')
+    product = db.relationship('Product', back_populates='reviews', lazy='select')
 
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        # One row per product in a cart; add_to_cart upserts against it
+        db.UniqueConstraint('user_id', 'product_id', name='uq_cart_items_user_product'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     quantity = db.Column(db.Integer, nullable=False, default=1)
-    added_at = db.Column(db.DateTime, default=datetime.utcnow)
+    added_at = db.Column(db.DateTime, server_default=utcnow())
     
     # Foreign keys
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+
+    # Relationships
+    user = db.relationship('User', back_populates='cart_items', lazy='select')
+    product = db.relationship('Product', back_populates='cart_items', lazy='select')
 
 
 class ProductImage(db.Model):
     __tablename__ = 'product_images'
+    __table_args__ = (
+        # Only primary images are looked up by product in listings
+        db.Index('ix_product_images_primary', 'product_id', postgresql_where=db.text('is_primary')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     image_url = db.Column(db.String(255), nullable=False)
@@ -140,4 +326,84 @@ class ProductImage(db.Model):
     is_primary = db.Column(db.Boolean, default=False)
     
     # Foreign keys
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
\ No newline at end of file
+    # active_history loads the old value on reassignment so the product it left can be refreshed
+    product_id = column_property(
+        db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False, index=True),
+        active_history=True
+    )
+
+    # Relationships
+    product = db.relationship('Product', back_populates='images', lazy='select')
+
+
+def refresh_product_rating(connection, product_id):
+    reviews = db.select(Review.rating).where(Review.product_id == product_id).subquery()
+    connection.execute(
+        db.update(Product.__table__)
+        .where(Product.id == product_id)
+        .values(
+            avg_rating=db.select(db.func.coalesce(db.func.round(db.func.avg(reviews.c.rating), 2), 0)).scalar_subquery(),
+            review_count=db.select(db.func.count()).select_from(reviews).scalar_subquery()
+        )
+    )
+
+
+def refresh_primary_image(connection, product_id):
+    connection.execute(
+        db.update(Product.__table__)
+        .where(Product.id == product_id)
+        .values(primary_image_url=(
+            db.select(ProductImage.image_url)
+            .where(ProductImage.product_id == product_id, ProductImage.is_primary == True)
+            .order_by(ProductImage.id)
+            .limit(1)
+            .scalar_subquery()
+        ))
+    )
+
+
+# A row moved to another product changes the summary of the product it left as well
+def _affected_product_ids(target):
+    previous = inspect(target).attrs.product_id.history.deleted
+    return {target.product_id, *(product_id for product_id in previous if product_id is not None)}
+
+
+# Core inserts bypass these, so callers using them refresh explicitly
+@event.listens_for(Review, 'after_insert')
+@event.listens_for(Review, 'after_update')
+@event.listens_for(Review, 'after_delete')
+def _review_changed(mapper, connection, target):
+    for product_id in _affected_product_ids(target):
+        refresh_product_rating(connection, product_id)
+
+
+@event.listens_for(ProductImage, 'after_insert')
+@event.listens_for(ProductImage, 'after_update')
+@event.listens_for(ProductImage, 'after_delete')
+def _product_image_changed(mapper, connection, target):
+    for product_id in _affected_product_ids(target):
+        refresh_primary_image(connection, product_id)
+
+
+@event.listens_for(Category, 'after_update')
+@event.listens_for(Category, 'after_delete')
+def _category_changed(mapper, connection, target):
+    _queue_eviction(_category_cache, target)
+
+
+@event.listens_for(Product, 'after_update')
+@event.listens_for(Product, 'after_delete')
+def _product_changed(mapper, connection, target):
+    _queue_eviction(_product_cache, target)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_committed_snapshots(session):
+    for cache, key in session.info.pop('snapshot_evictions', ()):
+        _evict_snapshot(cache, key)
+
+
+# Rolled-back changes never reached the database, so the snapshots are still current
+@event.listens_for(Session, 'after_rollback')
+def _discard_snapshot_evictions(session):
+    session.info.pop('snapshot_evictions', None)
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+# Run against in-memory SQLite and an unreachable Redis, so every request goes to the database
+os.environ['DATABASE_URI'] = 'sqlite://'
+os.environ['REDIS_URL'] = 'redis://localhost:1/0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app  # noqa: E402
+from extensions import db  # noqa: E402
+import models  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+    models._category_cache.clear()
+    models._product_cache.clear()
+    models._snapshot_generations.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# Collects the SQL statements run inside the block, e.g.
+#   with count_queries() as queries: client.get('/products')
+#   assert len(queries) == 1
+@pytest.fixture
+def count_queries(app):
+    @contextmanager
+    def counter():
+        queries = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            queries.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield queries
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    return counter
@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from extensions import db
+from models import Address, CartItem, Category, Product, ProductImage, Review, User
+
+# Each route must run a fixed number of statements however many rows it renders
+ITEM_COUNTS = [1, 5]
+
+
+@pytest.fixture
+def shop(app):
+    def build(items):
+        user = User(username='shopper', email='shopper@example.com')
+        user.set_password('secret')
+        category = Category(name='Books')
+        db.session.add_all([user, category])
+        db.session.flush()
+
+        address = Address(street='1 Main St', city='Springfield', country='US', zip_code='12345',
+                          is_default=True, user_id=user.id)
+        products = [
+            Product(name=f'Book {i}', price=Decimal('9.99'), stock=10, sku=f'SKU-{i}', category_id=category.id)
+            for i in range(items)
+        ]
+        db.session.add_all([address, *products])
+        db.session.flush()
+
+        for product in products:
+            db.session.add_all([
+                ProductImage(image_url=f'{product.sku}-front.jpg', is_primary=True, product_id=product.id),
+                ProductImage(image_url=f'{product.sku}-back.jpg', product_id=product.id),
+                Review(rating=4, comment='Good read', user_id=user.id, product_id=product.id),
+                CartItem(quantity=1, user_id=user.id, product_id=product.id),
+            ])
+        db.session.commit()
+
+        token = create_access_token(identity=str(user.id), additional_claims={'is_admin': False})
+        return {
+            'headers': {'Authorization': f'Bearer {token}'},
+            'address_id': address.id,
+            'product_id': products[0].id,
+        }
+
+    return build
+
+
+@pytest.mark.parametrize('items', ITEM_COUNTS)
+def test_product_listing(client, shop, count_queries, items):
+    shop(items)
+
+    with count_queries() as queries:
+        response = client.get('/products')
+
+    assert response.status_code == 200
+    assert len(response.get_json()['products']) == items
+    assert len(queries) == 1
+
+
+def test_product_listing_reads_only_primary_image(client, shop, count_queries):
+    shop(3)
+
+    with count_queries() as queries:
+        response = client.get('/products')
+
+    # The primary image URL is denormalized onto products; the secondary images are never loaded
+    assert not any('product_images' in statement for statement in queries)
+    assert [product['image_url'] for product in response.get_json()['products']] == [
+        'SKU-0-front.jpg', 'SKU-1-front.jpg', 'SKU-2-front.jpg'
+    ]
+
+
+@pytest.mark.parametrize('items', ITEM_COUNTS)
+def test_product_detail(client, shop, count_queries, items):
+    product_id = shop(items)['product_id']
+
+    with count_queries() as queries:
+        response = client.get(f'/api/products/{product_id}')
+
+    assert response.status_code == 200
+    assert response.get_json()['category_name'] == 'Books'
+    assert len(queries) == 3
+
+
+@pytest.mark.parametrize('items', ITEM_COUNTS)
+def test_checkout(client, shop, count_queries, items):
+    customer = shop(items)
+
+    with count_queries() as queries:
+        response = client.post('/api/orders', headers=customer['headers'],
+                               json={'shipping_address_id': customer['address_id']})
+
+    assert response.status_code == 201
+    assert response.get_json()['order']['total_amount'] == str(Decimal('9.99') * items)
+    assert len(queries) == 8
+
+
+@pytest.mark.parametrize('items', ITEM_COUNTS)
+def test_order_details(client, shop, count_queries, items):
+    customer = shop(items)
+    order_id = client.post('/api/orders', headers=customer['headers'],
+                           json={'shipping_address_id': customer['address_id']}).get_json()['order']['id']
+
+    with count_queries() as queries:
+        response = client.get(f'/api/orders/{order_id}', headers=customer['headers'])
+
+    assert response.status_code == 200
+    assert len(response.get_json()['items']) == items
+    assert len(queries) == 1
+
+
+def test_registered_token_authenticates(client):
+    # Tokens issued by register must pass the subject check on protected routes
+    response = client.post('/register', json={'username': 'newcomer', 'email': 'newcomer@example.com',
+                                              'password': 'secret'})
+    token = response.get_json()['access_token']
+
+    response = client.get('/users/me', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert response.get_json()['username'] == 'newcomer'